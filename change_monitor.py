@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+限制與費用變更監控腳本
+功能：
+1. 以固定間隔輪詢 public/get_limitations_and_fees API（共用同一個 Session，使用條件式請求）
+2. 與前一次快照做結構差異比對
+3. 只有在資料變更時才執行頁面比對測試、發送 Slack 通知並寫入 Google Sheets
+4. 快照以內容雜湊儲存於本機，相同快照只保存一份
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import argparse
+
+from test_result_handler import TestResultHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'robotframework_tests', 'libraries'))
+from ApiLibrary import ApiLibrary  # noqa: E402
+
+# 串列元素若為字典且都包含以下其中一組欄位，則以該組欄位作為比對識別（而非索引）
+# 依序嘗試，單一欄位不唯一時（例如同一幣別有多個提領協定）再改用組合欄位
+LIST_IDENTITY_KEYS = (
+    ('currency',),
+    ('pair',),
+    ('rank',),
+    ('currency', 'protocol'),
+    ('currency', 'network'),
+)
+
+
+def _identity_label(item: Dict[str, Any], keys: tuple) -> str:
+    """以識別欄位的 JSON 值組成元素標籤（例如 currency="USDT",protocol="ERC20"）"""
+    return ','.join(f"{key}={json.dumps(item[key], sort_keys=True, ensure_ascii=False)}"
+                    for key in keys)
+
+
+def _is_identity(items: list, keys: tuple) -> bool:
+    """判斷串列中所有元素是否都包含該組欄位，且標籤不重複"""
+    if not all(isinstance(item, dict) and all(key in item for key in keys) for item in items):
+        return False
+    labels = [_identity_label(item, keys) for item in items]
+    return len(set(labels)) == len(labels)
+
+
+def _list_identity_keys(old: list, new: list) -> Optional[tuple]:
+    """找出新舊兩個串列都適用的識別欄位組合"""
+    if not old or not new:
+        return None
+    for keys in LIST_IDENTITY_KEYS:
+        if _is_identity(old, keys) and _is_identity(new, keys):
+            return keys
+    return None
+
+
+def compute_structural_diff(old: Any, new: Any, path: str = '') -> List[Dict[str, Any]]:
+    """
+    計算兩份 JSON 資料的結構差異
+
+    Args:
+        old: 前一次快照
+        new: 本次快照
+        path: 目前比對的欄位路徑（遞迴使用）
+
+    Returns:
+        差異列表，每筆包含 path、type（added / removed / changed）、old、new
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in old:
+            child_path = f"{path}.{key}" if path else str(key)
+            if key not in new:
+                changes.append({'path': child_path, 'type': 'removed', 'old': old[key], 'new': None})
+            else:
+                changes.extend(compute_structural_diff(old[key], new[key], child_path))
+        for key in new:
+            if key not in old:
+                child_path = f"{path}.{key}" if path else str(key)
+                changes.append({'path': child_path, 'type': 'added', 'old': None, 'new': new[key]})
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        identity_keys = _list_identity_keys(old, new)
+        if identity_keys:
+            # 以識別欄位對應元素，避免新增或移除一筆時後續元素全部被視為變更
+            old_items = {_identity_label(item, identity_keys): item for item in old}
+            new_items = {_identity_label(item, identity_keys): item for item in new}
+        else:
+            old_items = {str(i): item for i, item in enumerate(old)}
+            new_items = {str(i): item for i, item in enumerate(new)}
+
+        changes = []
+        for ident, item in old_items.items():
+            child_path = f"{path}[{ident}]"
+            if ident not in new_items:
+                changes.append({'path': child_path, 'type': 'removed', 'old': item, 'new': None})
+            else:
+                changes.extend(compute_structural_diff(item, new_items[ident], child_path))
+        for ident, item in new_items.items():
+            if ident not in old_items:
+                changes.append({'path': f"{path}[{ident}]", 'type': 'added', 'old': None, 'new': item})
+        return changes
+
+    if old != new or type(old) is not type(new):
+        return [{'path': path, 'type': 'changed', 'old': old, 'new': new}]
+    return []
+
+
+class SnapshotStore:
+    """以內容雜湊儲存快照的本機儲存區（相同內容只寫入一次）"""
+
+    def __init__(self, directory: str = 'results/snapshots'):
+        """
+        初始化快照儲存區
+
+        Args:
+            directory: 快照存放資料夾
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def compute_hash(data: Any) -> str:
+        """計算快照的正規化內容雜湊"""
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def load_latest(self) -> Optional[Dict[str, Any]]:
+        """
+        讀取最近一次記錄的快照
+
+        Returns:
+            包含 hash 與 data 的字典；尚無快照時回傳 None
+        """
+        if not os.path.exists(self.index_path):
+            return None
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                lines = [line for line in f if line.strip()]
+            if not lines:
+                return None
+
+            snapshot_hash = json.loads(lines[-1])['hash']
+            with open(self._snapshot_path(snapshot_hash), 'r', encoding='utf-8') as f:
+                return {'hash': snapshot_hash, 'data': json.load(f)}
+        except Exception as e:
+            print(f"警告: 無法讀取先前的快照: {e}")
+            return None
+
+    def save(self, data: Any, snapshot_hash: Optional[str] = None) -> str:
+        """
+        儲存快照並在索引中記錄一筆紀錄
+
+        Args:
+            data: 快照資料
+            snapshot_hash: 已計算好的內容雜湊（可選）
+
+        Returns:
+            快照的內容雜湊
+        """
+        snapshot_hash = snapshot_hash or self.compute_hash(data)
+        snapshot_path = self._snapshot_path(snapshot_hash)
+
+        # 相同內容的快照已存在時不重複寫入；先寫入暫存檔再置換，避免中斷時留下不完整的快照
+        if not os.path.exists(snapshot_path):
+            temp_path = f"{snapshot_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(temp_path, snapshot_path)
+
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'hash': snapshot_hash,
+                'timestamp': datetime.now().isoformat()
+            }) + '\n')
+
+        return snapshot_hash
+
+    def _snapshot_path(self, snapshot_hash: str) -> str:
+        return os.path.join(self.directory, f"{snapshot_hash}.json")
+
+
+class ConditionalApiLibrary(ApiLibrary):
+    """
+    支援條件式請求的 ApiLibrary（僅供監控使用）
+
+    ETag / Last-Modified 狀態只存在於此類別，不會成為 Robot Framework 測試套件可呼叫的關鍵字
+    """
+
+    def __init__(self, base_url: str = "https://api.bitopro.com/v3"):
+        """
+        初始化條件式請求的 API Library
+
+        Args:
+            base_url: BitoPro API 基礎 URL
+        """
+        super().__init__(base_url)
+        self.etag = None
+        self.last_modified = None
+
+    def get_limitations_and_fees_if_modified(self) -> Optional[Dict[str, Any]]:
+        """
+        以條件式請求呼叫 public/get_limitations_and_fees API
+
+        Returns:
+            API 回應的 JSON 資料；資料未變更（304）時回傳 None
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        response = self._request_limitations_and_fees(headers)
+        if response.status_code == 304:
+            return None
+
+        self.last_response = response
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+        return response.json()
+
+
+class ChangeMonitor:
+    """限制與費用變更監控器"""
+
+    def __init__(self, api: ConditionalApiLibrary, handler: TestResultHandler,
+                 store: SnapshotStore,
+                 slack_channel: Optional[str] = None,
+                 worksheet_name: str = "限制與費用變更",
+                 robot_suite: Optional[str] = None,
+                 output_dir: str = 'results/monitor',
+                 page_check_timeout: int = 600):
+        """
+        初始化變更監控器
+
+        Args:
+            api: ConditionalApiLibrary 實例（整個監控期間共用同一個 Session）
+            handler: TestResultHandler 實例，負責 Slack 與 Google Sheets
+            store: 快照儲存區
+            slack_channel: Slack 頻道名稱（未設定時不發送通知）
+            worksheet_name: Google Sheets 工作表名稱
+            robot_suite: 頁面比對用的 Robot Framework 測試檔（未設定時跳過頁面比對）
+            output_dir: 頁面比對測試結果輸出資料夾
+            page_check_timeout: 頁面比對測試的執行時間上限（秒）
+        """
+        self.api = api
+        self.handler = handler
+        self.store = store
+        self.slack_channel = slack_channel
+        self.worksheet_name = worksheet_name
+        self.robot_suite = robot_suite
+        self.output_dir = output_dir
+        self.page_check_timeout = page_check_timeout
+
+        # 基準快照只在所有目的地都送達後才更新；各目的地另外記錄已送達的快照，
+        # 送達失敗的目的地會在下一輪重試，已送達的目的地只會收到之後的新差異
+        latest = store.load_latest()
+        self.previous_hash = latest['hash'] if latest else None
+        self.previous_data = latest['data'] if latest else None
+        self.delivered = {}
+        self.pending = None
+
+        if self.slack_channel and not self.handler.slack_client:
+            print("警告: 已設定 Slack 頻道但 Slack 客戶端未初始化，將不發送變更通知")
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """
+        執行一次輪詢
+
+        Returns:
+            本次偵測到的差異列表（相對於基準快照；無變更時為空列表）
+        """
+        data = self.api.get_limitations_and_fees_if_modified()
+        if data is None:
+            if self.pending is None:
+                print(f"{datetime.now().isoformat()} API 回傳 304，資料未變更")
+                return []
+            # 資料未再變更，但上一輪的變更尚未送達，重試通知
+            data = self.pending['data']
+
+        snapshot_hash = self.store.compute_hash(data)
+
+        # 第一次執行只建立基準快照，不視為變更
+        if self.previous_data is None:
+            self._advance_baseline(data, snapshot_hash)
+            print(f"{datetime.now().isoformat()} 已建立基準快照: {snapshot_hash[:12]}")
+            return []
+
+        changes = compute_structural_diff(self.previous_data, data)
+        if not changes and not self.delivered:
+            if snapshot_hash == self.previous_hash:
+                print(f"{datetime.now().isoformat()} 快照內容相同，略過")
+                self.pending = None
+            else:
+                # 內容雜湊不同但沒有結構差異（例如串列順序改變），直接更新基準
+                self._advance_baseline(data, snapshot_hash)
+            return []
+
+        if self.pending is None or self.pending['hash'] != snapshot_hash:
+            self.pending = {
+                'hash': snapshot_hash,
+                'data': data,
+                'page_checked': False,
+                'test_results': None
+            }
+
+        print(f"{datetime.now().isoformat()} 偵測到 {len(changes)} 項變更")
+        if self._handle_changes():
+            self._advance_baseline(data, snapshot_hash)
+        else:
+            print("警告: 變更通知未完全送達，保留前一次快照作為基準，下一輪重試")
+        return changes
+
+    def run(self, interval: int):
+        """
+        持續輪詢直到被中斷
+
+        Args:
+            interval: 輪詢間隔（秒）
+        """
+        print(f"開始監控限制與費用變更，輪詢間隔 {interval} 秒")
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                # 單次輪詢失敗不中止監控，等待下一輪重試
+                print(f"輪詢時發生錯誤: {e}")
+            time.sleep(interval)
+
+    def _advance_baseline(self, data: Any, snapshot_hash: str):
+        """儲存快照並將其設為新的比對基準"""
+        self.store.save(data, snapshot_hash)
+        self.previous_hash, self.previous_data = snapshot_hash, data
+        self.delivered = {}
+        self.pending = None
+
+    def _enabled_destinations(self) -> List[str]:
+        """回傳已完整設定、需要送達的目的地"""
+        destinations = []
+        if self.slack_channel and self.handler.slack_client:
+            destinations.append('slack')
+        if self.handler.gc and self.handler.google_sheet_id:
+            destinations.append('sheets')
+        return destinations
+
+    def _handle_changes(self) -> bool:
+        """
+        資料變更時執行頁面比對並更新 Slack / Google Sheets
+
+        每個目的地各自與其最後送達的快照比對，重試時不會重複發送已送達的差異
+
+        Returns:
+            所有已設定的目的地是否皆已送達目前快照
+        """
+        pending = self.pending
+        if not pending['page_checked']:
+            pending['test_results'] = self._run_page_comparison()
+            pending['page_checked'] = True
+
+        all_delivered = True
+        for destination in self._enabled_destinations():
+            base_hash, base_data = self.delivered.get(
+                destination, (self.previous_hash, self.previous_data)
+            )
+            if base_hash == pending['hash']:
+                continue
+
+            changes = compute_structural_diff(base_data, pending['data'])
+            if not changes:
+                delivered = True
+            elif destination == 'slack':
+                delivered = self.handler.send_change_notification(
+                    self.slack_channel, changes, pending['test_results']
+                )
+            else:
+                delivered = self.handler.write_changes_to_google_sheets(changes, self.worksheet_name)
+
+            if delivered:
+                self.delivered[destination] = (pending['hash'], pending['data'])
+            else:
+                all_delivered = False
+
+        return all_delivered
+
+    def _run_page_comparison(self) -> Optional[Dict[str, Any]]:
+        """
+        執行 Robot Framework 的資料比對測試（data_validation 標籤）
+
+        Returns:
+            測試結果字典；測試未能完成時 completed 為 False 並附上 error；未設定測試檔時回傳 None
+        """
+        if not self.robot_suite:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_xml = os.path.join(self.output_dir, 'output.xml')
+        # 移除上一次的結果，避免 robot 未產生輸出時誤用舊資料
+        if os.path.exists(output_xml):
+            os.remove(output_xml)
+
+        try:
+            result = subprocess.run([
+                'robot',
+                '--outputdir', self.output_dir,
+                '--include', 'data_validation',
+                '--variable', f'API_BASE_URL:{self.api.base_url}',
+                self.robot_suite
+            ], check=False, timeout=self.page_check_timeout)
+        except subprocess.TimeoutExpired:
+            error = f"超過 {self.page_check_timeout} 秒未完成，已中止"
+            print(f"頁面比對測試{error}")
+            return {'completed': False, 'error': error}
+        except OSError as e:
+            print(f"執行頁面比對測試時發生錯誤: {e}")
+            return {'completed': False, 'error': str(e)}
+
+        # robot 的 exit code 0-250 為失敗測試數，大於 250 代表執行本身失敗
+        if result.returncode > 250 or not os.path.exists(output_xml):
+            error = f"exit code: {result.returncode}"
+            print(f"頁面比對測試未正常完成（{error}）")
+            return {'completed': False, 'error': error}
+
+        return self.handler.parse_robot_framework_results(output_xml)
+
+
+def _positive_int(value: str) -> int:
+    """argparse 用：只接受正整數"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"必須為整數: {value}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"必須大於 0: {value}")
+    return number
+
+
+def main():
+    """主程式入口"""
+    parser = argparse.ArgumentParser(description='監控限制與費用變更，只在資料變更時發送通知')
+    parser.add_argument('--interval', type=_positive_int,
+                        default=os.getenv('MONITOR_INTERVAL', '300'),
+                        help='輪詢間隔（秒）')
+    parser.add_argument('--once', action='store_true', help='只執行一次輪詢後結束')
+    parser.add_argument('--api-base-url', type=str,
+                        default=os.getenv('API_BASE_URL', 'https://api.bitopro.com/v3'),
+                        help='BitoPro API 基礎 URL')
+    parser.add_argument('--snapshot-dir', type=str, default='results/snapshots', help='快照存放資料夾')
+    parser.add_argument('--robot-suite', type=str,
+                        default='robotframework_tests/tests/limitations_and_fees_tests.robot',
+                        help='頁面比對用的 Robot Framework 測試檔')
+    parser.add_argument('--skip-page-check', action='store_true', help='資料變更時不執行頁面比對')
+    parser.add_argument('--page-check-timeout', type=_positive_int, default=600,
+                        help='頁面比對測試的執行時間上限（秒）')
+    parser.add_argument('--slack-channel', type=str, default=os.getenv('SLACK_CHANNEL'),
+                        help='Slack 頻道名稱')
+    parser.add_argument('--slack-token', type=str, help='Slack Bot Token')
+    parser.add_argument('--google-credentials', type=str, help='Google 憑證檔案路徑')
+    parser.add_argument('--google-sheet-id', type=str, help='Google Sheet ID')
+    parser.add_argument('--worksheet-name', type=str, default='限制與費用變更', help='工作表名稱')
+
+    args = parser.parse_args()
+
+    handler = TestResultHandler(
+        slack_token=args.slack_token,
+        google_credentials_path=args.google_credentials,
+        google_sheet_id=args.google_sheet_id
+    )
+
+    monitor = ChangeMonitor(
+        api=ConditionalApiLibrary(args.api_base_url),
+        handler=handler,
+        store=SnapshotStore(args.snapshot_dir),
+        slack_channel=args.slack_channel,
+        worksheet_name=args.worksheet_name,
+        robot_suite=None if args.skip_page_check else args.robot_suite,
+        page_check_timeout=args.page_check_timeout
+    )
+
+    if args.once:
+        monitor.poll_once()
+        return
+
+    try:
+        monitor.run(args.interval)
+    except KeyboardInterrupt:
+        print("\n監控已停止")
+
+
+if __name__ == '__main__':
+    main()
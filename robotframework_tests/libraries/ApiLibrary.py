@@ -33,12 +33,25 @@ class ApiLibrary:
         Returns:
             API 回應的 JSON 資料
         """
+        response = self._request_limitations_and_fees()
+        self.last_response = response
+        return response.json()
+    
+    def _request_limitations_and_fees(self, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        發送 public/get_limitations_and_fees 請求（不對外提供為關鍵字）
+        
+        Args:
+            headers: 額外的請求標頭（例如條件式請求的 If-None-Match）
+        
+        Returns:
+            API 回應物件
+        """
         endpoint = f"{self.base_url}/public/get_limitations_and_fees"
         try:
-            response = self.session.get(endpoint, timeout=10)
+            response = self.session.get(endpoint, headers=headers, timeout=10)
             response.raise_for_status()
-            self.last_response = response
-            return response.json()
+            return response
         except requests.exceptions.RequestException as e:
             raise Exception(f"API 呼叫失敗: {str(e)}")
     
@@ -12,7 +12,7 @@ import sys
 import json
 import xml.etree.ElementTree as ET
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import argparse
 
 # Slack SDK
@@ -23,6 +23,15 @@ from slack_sdk.errors import SlackApiError
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 
+# 變更通知中最多列出的差異項目數（避免 Slack 訊息過長）
+MAX_NOTIFIED_CHANGES = 20
+
+# 變更通知中單一欄位值顯示的最大字元數
+MAX_CHANGE_VALUE_LENGTH = 200
+
+# Slack section 區塊文字的字元上限
+SLACK_SECTION_TEXT_LIMIT = 3000
+
 
 class TestResultHandler:
     """測試結果處理器"""
@@ -289,6 +298,151 @@ class TestResultHandler:
             print(f"寫入 Google Sheets 時發生錯誤: {e}")
             return False
     
+    def send_change_notification(self, channel: str, changes: List[Dict[str, Any]],
+                                 test_results: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        發送限制與費用變更通知（只包含差異項目）
+
+        Args:
+            channel: Slack 頻道名稱或 ID
+            changes: 結構差異列表（每筆包含 path、type、old、new）
+            test_results: 頁面比對的測試結果字典（可選；completed 為 False 時顯示未完成）
+
+        Returns:
+            是否成功發送
+        """
+        if not self.slack_client:
+            print("警告: Slack 客戶端未初始化，跳過通知")
+            return False
+
+        try:
+            current_time = datetime.now().strftime('%Y/%m/%d %H:%M:%S')
+
+            lines = [f"{current_time} 偵測到限制與費用變更（{len(changes)} 項）", ""]
+            for change in changes[:MAX_NOTIFIED_CHANGES]:
+                lines.append(f"• {self._format_change(change)}")
+            if len(changes) > MAX_NOTIFIED_CHANGES:
+                lines.append(f"…其餘 {len(changes) - MAX_NOTIFIED_CHANGES} 項請參考 Google Sheets")
+
+            if test_results:
+                lines.append("")
+                if test_results.get('completed', True):
+                    lines.append(
+                        f"頁面比對: 通過 {test_results.get('passed', 0)} / "
+                        f"失敗 {test_results.get('failed', 0)}"
+                    )
+                else:
+                    lines.append(f"頁面比對未完成: {test_results.get('error', '未知錯誤')}")
+
+            # Slack 的 section 文字上限為 3000 字元，超過時拆成多個區塊
+            blocks = [
+                {
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": text
+                    }
+                }
+                for text in self._split_section_text(lines)
+            ]
+
+            self.slack_client.chat_postMessage(
+                channel=channel,
+                text=f"{current_time} 偵測到限制與費用變更",
+                blocks=blocks
+            )
+
+            print(f"變更通知已發送到 {channel}")
+            return True
+
+        except SlackApiError as e:
+            print(f"發送變更通知時發生錯誤: {e.response['error']}")
+            return False
+        except Exception as e:
+            print(f"發送變更通知時發生未預期的錯誤: {e}")
+            return False
+
+    def write_changes_to_google_sheets(self, changes: List[Dict[str, Any]],
+                                       worksheet_name: str = "限制與費用變更") -> bool:
+        """
+        將限制與費用的變更項目寫入 Google Sheets（每項變更一列）
+
+        Args:
+            changes: 結構差異列表
+            worksheet_name: 工作表名稱
+
+        Returns:
+            是否成功寫入
+        """
+        if not self.gc:
+            print("警告: Google Sheets 客戶端未初始化，跳過寫入")
+            return False
+
+        if not self.google_sheet_id:
+            print("警告: Google Sheet ID 未設定，跳過寫入")
+            return False
+
+        try:
+            sheet = self.gc.open_by_key(self.google_sheet_id)
+
+            try:
+                worksheet = sheet.worksheet(worksheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                worksheet = sheet.add_worksheet(title=worksheet_name, rows=1000, cols=10)
+                worksheet.append_row(['時間戳記', '欄位路徑', '變更類型', '舊值', '新值'])
+
+            timestamp = datetime.now().isoformat()
+            rows = [
+                [
+                    timestamp,
+                    change['path'],
+                    change['type'],
+                    json.dumps(change.get('old'), ensure_ascii=False),
+                    json.dumps(change.get('new'), ensure_ascii=False)
+                ]
+                for change in changes
+            ]
+            worksheet.append_rows(rows)
+
+            print(f"變更紀錄已寫入 Google Sheets: {worksheet_name}")
+            return True
+
+        except Exception as e:
+            print(f"寫入 Google Sheets 時發生錯誤: {e}")
+            return False
+
+    @staticmethod
+    def _format_change(change: Dict[str, Any]) -> str:
+        """將單筆差異格式化為可讀文字（過長的值會被截斷）"""
+        def format_value(value: Any) -> str:
+            text = json.dumps(value, ensure_ascii=False)
+            if len(text) > MAX_CHANGE_VALUE_LENGTH:
+                text = text[:MAX_CHANGE_VALUE_LENGTH] + '…'
+            return text
+
+        old = format_value(change.get('old'))
+        new = format_value(change.get('new'))
+        if change['type'] == 'added':
+            return f"新增 `{change['path']}`: {new}"
+        if change['type'] == 'removed':
+            return f"移除 `{change['path']}`: {old}"
+        return f"變更 `{change['path']}`: {old} → {new}"
+
+    @staticmethod
+    def _split_section_text(lines: List[str]) -> List[str]:
+        """將訊息逐行分組，讓每組文字都不超過 Slack section 的字元上限"""
+        chunks = []
+        current = ""
+        for line in lines:
+            line = line[:SLACK_SECTION_TEXT_LIMIT - 1]
+            if current and len(current) + len(line) + 1 > SLACK_SECTION_TEXT_LIMIT:
+                chunks.append(current)
+                current = ""
+            current += line + "\n"
+        if current.strip():
+            chunks.append(current)
+        return chunks
+
     def process_results(self, robot_output_xml: Optional[str] = None,
                        jest_json_path: Optional[str] = None,
                        slack_channel: Optional[str] = None,
@@ -0,0 +1,409 @@
+"""
+change_monitor.py 單元測試
+執行方式: python -m unittest discover -s tests
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from change_monitor import (  # noqa: E402
+    ChangeMonitor,
+    ConditionalApiLibrary,
+    SnapshotStore,
+    compute_structural_diff,
+    _positive_int,
+)
+
+
+class FakeApi:
+    """依序回傳預先設定資料的 API 替身（None 代表 304）"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.base_url = 'https://api.example.com/v3'
+
+    def get_limitations_and_fees_if_modified(self):
+        return self.responses.pop(0)
+
+
+class FakeHandler:
+    """記錄呼叫次數的 TestResultHandler 替身"""
+
+    def __init__(self, slack_ok=True, sheets_ok=True, slack_enabled=True, sheets_enabled=True):
+        self.slack_ok = slack_ok
+        self.sheets_ok = sheets_ok
+        self.slack_client = object() if slack_enabled else None
+        self.gc = object() if sheets_enabled else None
+        self.google_sheet_id = 'sheet-id' if sheets_enabled else None
+        self.slack_calls = []
+        self.sheets_calls = []
+
+    def send_change_notification(self, channel, changes, test_results=None):
+        self.slack_calls.append(changes)
+        return self.slack_ok
+
+    def write_changes_to_google_sheets(self, changes, worksheet_name):
+        self.sheets_calls.append(changes)
+        return self.sheets_ok
+
+    def parse_robot_framework_results(self, output_xml_path):
+        return {'total': 2, 'passed': 2, 'failed': 0}
+
+
+class ComputeStructuralDiffTests(unittest.TestCase):
+
+    def test_identical_data_has_no_changes(self):
+        data = {'a': [1, {'b': 2}], 'c': None}
+        self.assertEqual(compute_structural_diff(data, json.loads(json.dumps(data))), [])
+
+    def test_dict_added_removed_and_changed(self):
+        changes = compute_structural_diff({'a': 1, 'b': {'c': 2}}, {'b': {'c': 3}, 'd': 4})
+        self.assertEqual(changes, [
+            {'path': 'a', 'type': 'removed', 'old': 1, 'new': None},
+            {'path': 'b.c', 'type': 'changed', 'old': 2, 'new': 3},
+            {'path': 'd', 'type': 'added', 'old': None, 'new': 4},
+        ])
+
+    def test_list_items_matched_by_identity_key(self):
+        old = {'fees': [{'currency': 'BTC', 'fee': 1}, {'currency': 'ETH', 'fee': 2}]}
+        new = {'fees': [{'currency': 'ETH', 'fee': 3}, {'currency': 'SOL', 'fee': 1}]}
+        changes = compute_structural_diff(old, new)
+        self.assertEqual([(c['path'], c['type']) for c in changes], [
+            ('fees[currency="BTC"]', 'removed'),
+            ('fees[currency="ETH"].fee', 'changed'),
+            ('fees[currency="SOL"]', 'added'),
+        ])
+
+    def test_list_items_matched_by_composite_identity(self):
+        old = [
+            {'currency': 'USDT', 'protocol': 'ERC20', 'fee': 1},
+            {'currency': 'USDT', 'protocol': 'TRC20', 'fee': 2},
+            {'currency': 'BTC', 'protocol': 'BTC', 'fee': 3},
+        ]
+        new = [{'currency': 'ETH', 'protocol': 'ERC20', 'fee': 4}] + old
+        changes = compute_structural_diff(old, new)
+        self.assertEqual(changes, [{
+            'path': '[currency="ETH",protocol="ERC20"]',
+            'type': 'added',
+            'old': None,
+            'new': {'currency': 'ETH', 'protocol': 'ERC20', 'fee': 4},
+        }])
+
+    def test_identity_values_of_different_types_are_not_merged(self):
+        old = [{'currency': 1, 'fee': 1}, {'currency': '1', 'fee': 2}]
+        new = [{'currency': 1, 'fee': 1}, {'currency': '1', 'fee': 3}]
+        changes = compute_structural_diff(old, new)
+        self.assertEqual(changes, [
+            {'path': '[currency="1"].fee', 'type': 'changed', 'old': 2, 'new': 3},
+        ])
+
+    def test_identity_must_hold_in_both_lists(self):
+        old = [{'currency': 'USDT', 'protocol': 'ERC20', 'fee': 1}]
+        new = old + [{'currency': 'USDT', 'protocol': 'TRC20', 'fee': 2}]
+        changes = compute_structural_diff(old, new)
+        self.assertEqual([(c['path'], c['type']) for c in changes], [
+            ('[currency="USDT",protocol="TRC20"]', 'added'),
+        ])
+
+    def test_list_falls_back_to_index_when_key_missing(self):
+        old = [{'currency': 'BTC', 'fee': 1}, {'fee': 2}]
+        new = [{'currency': 'BTC', 'fee': 1}, {'fee': 3}]
+        changes = compute_structural_diff(old, new)
+        self.assertEqual(changes, [{'path': '[1].fee', 'type': 'changed', 'old': 2, 'new': 3}])
+
+    def test_list_falls_back_to_index_when_key_duplicated(self):
+        old = [{'pair': 'BTC/TWD', 'side': 'buy'}, {'pair': 'BTC/TWD', 'side': 'sell'}]
+        new = [{'pair': 'BTC/TWD', 'side': 'buy'}, {'pair': 'BTC/TWD', 'side': 'both'}]
+        changes = compute_structural_diff(old, new)
+        self.assertEqual([c['path'] for c in changes], ['[1].side'])
+
+    def test_list_falls_back_to_index_when_identity_keys_differ(self):
+        changes = compute_structural_diff([{'currency': 'BTC'}], [{'pair': 'BTC/TWD'}])
+        self.assertEqual([(c['path'], c['type']) for c in changes], [
+            ('[0].currency', 'removed'),
+            ('[0].pair', 'added'),
+        ])
+
+    def test_list_length_change_by_index(self):
+        changes = compute_structural_diff({'a': [1, 2]}, {'a': [1]})
+        self.assertEqual(changes, [{'path': 'a[1]', 'type': 'removed', 'old': 2, 'new': None}])
+
+    def test_leaf_comparison_is_type_sensitive(self):
+        self.assertEqual(compute_structural_diff({'a': 1}, {'a': 1.0}),
+                         [{'path': 'a', 'type': 'changed', 'old': 1, 'new': 1.0}])
+        self.assertEqual(len(compute_structural_diff({'a': 1}, {'a': True})), 1)
+        self.assertEqual(len(compute_structural_diff({'a': '1'}, {'a': 1})), 1)
+
+    def test_container_type_change_is_reported_as_changed(self):
+        changes = compute_structural_diff({'a': {'b': 1}}, {'a': [1]})
+        self.assertEqual(changes, [{'path': 'a', 'type': 'changed', 'old': {'b': 1}, 'new': [1]}])
+
+
+class SnapshotStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hash_ignores_key_order(self):
+        self.assertEqual(SnapshotStore.compute_hash({'a': 1, 'b': 2}),
+                         SnapshotStore.compute_hash({'b': 2, 'a': 1}))
+
+    def test_load_latest_without_snapshots(self):
+        self.assertIsNone(self.store.load_latest())
+
+    def test_identical_snapshots_are_stored_once(self):
+        first = self.store.save({'a': 1})
+        self.store.save({'a': 2})
+        third = self.store.save({'a': 1})
+
+        self.assertEqual(first, third)
+        snapshot_files = [name for name in os.listdir(self.directory) if name != 'index.jsonl']
+        self.assertEqual(len(snapshot_files), 2)
+        with open(self.store.index_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_interrupted_write_leaves_no_partial_snapshot(self):
+        with mock.patch('change_monitor.json.dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                self.store.save({'a': 1})
+        snapshot_hash = SnapshotStore.compute_hash({'a': 1})
+        self.assertFalse(os.path.exists(os.path.join(self.directory, f'{snapshot_hash}.json')))
+
+        self.store.save({'a': 1})
+        self.assertEqual(self.store.load_latest()['data'], {'a': 1})
+
+    def test_load_latest_returns_last_index_entry(self):
+        self.store.save({'a': 1})
+        snapshot_hash = self.store.save({'a': 2})
+        latest = SnapshotStore(self.directory).load_latest()
+        self.assertEqual(latest, {'hash': snapshot_hash, 'data': {'a': 2}})
+
+
+class ChangeMonitorPollTests(unittest.TestCase):
+
+    OLD = {'fees': [{'currency': 'BTC', 'fee': 1}]}
+    NEW = {'fees': [{'currency': 'BTC', 'fee': 2}]}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SnapshotStore(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _monitor(self, responses, handler=None, slack_channel='#testing'):
+        return ChangeMonitor(FakeApi(responses), handler or FakeHandler(), self.store,
+                             slack_channel=slack_channel)
+
+    def test_first_poll_only_records_baseline(self):
+        handler = FakeHandler()
+        monitor = self._monitor([self.OLD], handler)
+
+        self.assertEqual(monitor.poll_once(), [])
+        self.assertEqual(monitor.previous_data, self.OLD)
+        self.assertEqual(self.store.load_latest()['data'], self.OLD)
+        self.assertEqual(handler.slack_calls, [])
+
+    def test_not_modified_and_identical_snapshots_do_not_notify(self):
+        handler = FakeHandler()
+        monitor = self._monitor([self.OLD, None, self.OLD], handler)
+        for _ in range(3):
+            self.assertEqual(monitor.poll_once(), [])
+
+        self.assertEqual(handler.slack_calls, [])
+        with open(self.store.index_path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_change_is_delivered_and_becomes_baseline(self):
+        handler = FakeHandler()
+        monitor = self._monitor([self.OLD, self.NEW], handler)
+        monitor.poll_once()
+
+        changes = monitor.poll_once()
+
+        self.assertEqual([c['path'] for c in changes], ['fees[currency="BTC"].fee'])
+        self.assertEqual(len(handler.slack_calls), 1)
+        self.assertEqual(len(handler.sheets_calls), 1)
+        self.assertEqual(monitor.previous_data, self.NEW)
+        self.assertIsNone(monitor.pending)
+        self.assertEqual(self.store.load_latest()['data'], self.NEW)
+
+    def test_failed_delivery_keeps_baseline_and_retries_on_not_modified(self):
+        handler = FakeHandler(slack_ok=False)
+        monitor = self._monitor([self.OLD, self.NEW, None], handler)
+        monitor.poll_once()
+
+        monitor.poll_once()
+        self.assertEqual(monitor.previous_data, self.OLD)
+        self.assertEqual(self.store.load_latest()['data'], self.OLD)
+
+        handler.slack_ok = True
+        changes = monitor.poll_once()
+
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(len(handler.slack_calls), 2)
+        # Google Sheets 第一次已寫入成功，重試時不重複寫入
+        self.assertEqual(len(handler.sheets_calls), 1)
+        self.assertEqual(monitor.previous_data, self.NEW)
+        self.assertEqual(self.store.load_latest()['data'], self.NEW)
+
+    def test_exception_during_delivery_keeps_baseline(self):
+        handler = FakeHandler()
+        handler.send_change_notification = mock.Mock(side_effect=RuntimeError('boom'))
+        monitor = self._monitor([self.OLD, self.NEW], handler)
+        monitor.poll_once()
+
+        with self.assertRaises(RuntimeError):
+            monitor.poll_once()
+        self.assertEqual(monitor.previous_data, self.OLD)
+        self.assertEqual(self.store.load_latest()['data'], self.OLD)
+
+    def test_newer_snapshot_after_partial_delivery_sends_only_missing_deltas(self):
+        newer = {'fees': [{'currency': 'BTC', 'fee': 2}, {'currency': 'ETH', 'fee': 5}]}
+        handler = FakeHandler(sheets_ok=False)
+        monitor = self._monitor([self.OLD, self.NEW, newer], handler)
+        monitor.poll_once()
+        monitor.poll_once()
+        self.assertEqual(monitor.previous_data, self.OLD)
+
+        handler.sheets_ok = True
+        monitor.poll_once()
+
+        # Slack 已收到 OLD → NEW，只補送 NEW → newer；Google Sheets 收到完整的 OLD → newer
+        self.assertEqual([[c['path'] for c in call] for call in handler.slack_calls], [
+            ['fees[currency="BTC"].fee'],
+            ['fees[currency="ETH"]'],
+        ])
+        self.assertEqual([c['path'] for c in handler.sheets_calls[-1]], [
+            'fees[currency="BTC"].fee',
+            'fees[currency="ETH"]',
+        ])
+        self.assertEqual(monitor.previous_data, newer)
+        self.assertEqual(monitor.delivered, {})
+
+    def test_slack_channel_without_client_does_not_block_baseline(self):
+        handler = FakeHandler(slack_enabled=False)
+        monitor = self._monitor([self.OLD, self.NEW], handler)
+        monitor.poll_once()
+        monitor.poll_once()
+
+        self.assertEqual(handler.slack_calls, [])
+        self.assertEqual(len(handler.sheets_calls), 1)
+        self.assertEqual(monitor.previous_data, self.NEW)
+
+    def test_unconfigured_destinations_do_not_block_baseline(self):
+        handler = FakeHandler(sheets_enabled=False)
+        monitor = self._monitor([self.OLD, self.NEW], handler, slack_channel=None)
+        monitor.poll_once()
+        monitor.poll_once()
+
+        self.assertEqual(handler.slack_calls, [])
+        self.assertEqual(handler.sheets_calls, [])
+        self.assertEqual(monitor.previous_data, self.NEW)
+
+    def test_restart_compares_against_last_delivered_snapshot(self):
+        self._monitor([self.OLD]).poll_once()
+
+        handler = FakeHandler()
+        changes = self._monitor([self.NEW], handler).poll_once()
+
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(len(handler.slack_calls), 1)
+
+
+class PageComparisonTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output_xml = os.path.join(self.directory, 'output.xml')
+        self.monitor = ChangeMonitor(FakeApi([]), FakeHandler(),
+                                     SnapshotStore(os.path.join(self.directory, 'snapshots')),
+                                     robot_suite='suite.robot', output_dir=self.directory,
+                                     page_check_timeout=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_output_xml(self):
+        with open(self.output_xml, 'w', encoding='utf-8') as f:
+            f.write('<robot/>')
+
+    def test_passes_api_base_url_and_timeout(self):
+        def fake_run(command, **kwargs):
+            self._write_output_xml()
+            return subprocess.CompletedProcess(command, 0)
+
+        with mock.patch('change_monitor.subprocess.run', side_effect=fake_run) as run:
+            result = self.monitor._run_page_comparison()
+
+        command = run.call_args[0][0]
+        self.assertIn('API_BASE_URL:https://api.example.com/v3', command)
+        self.assertEqual(run.call_args[1]['timeout'], 5)
+        self.assertEqual(result['passed'], 2)
+
+    def test_timeout_returns_none(self):
+        with mock.patch('change_monitor.subprocess.run',
+                        side_effect=subprocess.TimeoutExpired('robot', 5)):
+            result = self.monitor._run_page_comparison()
+        self.assertFalse(result['completed'])
+        self.assertIn('5', result['error'])
+
+    def test_stale_output_is_not_reported_when_robot_fails(self):
+        self._write_output_xml()
+        with mock.patch('change_monitor.subprocess.run',
+                        return_value=subprocess.CompletedProcess([], 252)):
+            result = self.monitor._run_page_comparison()
+        self.assertEqual(result, {'completed': False, 'error': 'exit code: 252'})
+        self.assertFalse(os.path.exists(self.output_xml))
+
+    def test_not_configured_returns_none(self):
+        self.monitor.robot_suite = None
+        self.assertIsNone(self.monitor._run_page_comparison())
+
+
+class ConditionalApiLibraryTests(unittest.TestCase):
+
+    def _response(self, status_code, headers=None, data=None):
+        response = mock.Mock(status_code=status_code, headers=headers or {})
+        response.json.return_value = data
+        return response
+
+    def test_sends_validators_and_returns_none_on_not_modified(self):
+        api = ConditionalApiLibrary('https://api.example.com/v3')
+        api.session = mock.Mock()
+        api.session.get.side_effect = [
+            self._response(200, {'ETag': '"v1"', 'Last-Modified': 'Mon'}, {'a': 1}),
+            self._response(304),
+        ]
+
+        self.assertEqual(api.get_limitations_and_fees_if_modified(), {'a': 1})
+        self.assertIsNone(api.get_limitations_and_fees_if_modified())
+
+        second_headers = api.session.get.call_args_list[1][1]['headers']
+        self.assertEqual(second_headers, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'})
+        self.assertEqual(api.last_response.status_code, 200)
+
+
+class PositiveIntTests(unittest.TestCase):
+
+    def test_rejects_non_positive_values(self):
+        self.assertEqual(_positive_int('30'), 30)
+        for value in ('0', '-5', 'abc'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                _positive_int(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+test_result_handler.py 變更通知單元測試
+執行方式: python -m unittest discover -s tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import test_result_handler  # noqa: E402
+from test_result_handler import MAX_CHANGE_VALUE_LENGTH, SLACK_SECTION_TEXT_LIMIT  # noqa: E402
+
+
+class SendChangeNotificationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = test_result_handler.TestResultHandler(
+            slack_token=None, google_credentials_path='/nonexistent/credentials.json')
+        self.handler.slack_client = mock.Mock()
+
+    def _sent_blocks(self):
+        return self.handler.slack_client.chat_postMessage.call_args[1]['blocks']
+
+    def test_large_values_are_truncated_and_split_under_limit(self):
+        item = {'currency': 'NEW', 'networks': ['x' * 50] * 100}
+        changes = [
+            {'path': f'list{i}[currency=NEW]', 'type': 'added', 'old': None, 'new': item}
+            for i in range(20)
+        ]
+
+        self.assertTrue(self.handler.send_change_notification('#testing', changes))
+
+        blocks = self._sent_blocks()
+        self.assertGreater(len(blocks), 1)
+        for block in blocks:
+            self.assertLessEqual(len(block['text']['text']), SLACK_SECTION_TEXT_LIMIT)
+        text = ''.join(block['text']['text'] for block in blocks)
+        self.assertEqual(text.count('list'), 20)
+
+    def test_format_change_truncates_long_values(self):
+        change = {'path': 'a', 'type': 'changed', 'old': 'x' * 1000, 'new': 1}
+        formatted = test_result_handler.TestResultHandler._format_change(change)
+        self.assertLess(len(formatted), MAX_CHANGE_VALUE_LENGTH + 50)
+        self.assertIn('…', formatted)
+
+    def test_small_message_uses_single_block_with_page_results(self):
+        changes = [{'path': 'a', 'type': 'changed', 'old': 1, 'new': 2}]
+        self.handler.send_change_notification('#testing', changes, {'passed': 2, 'failed': 0})
+
+        blocks = self._sent_blocks()
+        self.assertEqual(len(blocks), 1)
+        self.assertIn('頁面比對: 通過 2 / 失敗 0', blocks[0]['text']['text'])
+
+
+    def test_incomplete_page_check_is_reported(self):
+        changes = [{'path': 'a', 'type': 'changed', 'old': 1, 'new': 2}]
+        self.handler.send_change_notification('#testing', changes,
+                                              {'completed': False, 'error': 'exit code: 252'})
+
+        text = self._sent_blocks()[0]['text']['text']
+        self.assertIn('頁面比對未完成: exit code: 252', text)
+        self.assertNotIn('通過', text)
+
+
+if __name__ == '__main__':
+    unittest.main()